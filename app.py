@@ -3,16 +3,16 @@
 
 import os
 import sys
+import json
 
-from urllib.parse import parse_qs
-from urllib.request import urlopen
+from xml.sax.saxutils import escape as xml_escape
 
 from chalice import Chalice, Rate, Response
 from twilio.twiml.voice_response import VoiceResponse
 
-from chalicelib.ext import url_of
+from chalicelib.ext import url_of, parsed_form
 from chalicelib.cli import cli_main
-from chalicelib.ivr import Ivr
+from chalicelib.ivr import Ivr, IvrSectionNotFoundError
 
 
 # App details & config
@@ -22,6 +22,10 @@ default_config_path = os.path.join('chalicelib', 'config.ini')
 
 app = Chalice(app_name=__app_name__)
 
+# Shared by the API routes
+route_methods = ['GET', 'POST']
+route_content_types = ['application/json', 'application/x-www-form-urlencoded']
+
 # CLI execution
 if __name__ == '__main__':
     cli_main(
@@ -35,7 +39,11 @@ if __name__ == '__main__':
 
 
 # Lambda execution
-ivr = Ivr(default_config_path, app)
+ivr = Ivr(
+    default_config_path,
+    app,
+    validate=not Ivr.is_config_validated(default_config_path)
+)
 
 lambda_ping_frequency_minutes = ivr.config.getint(
                                     'aws',
@@ -48,6 +56,38 @@ if lambda_ping_frequency_minutes != 0:
         ('config value: aws.lambda_ping_frequency_minutes '
             'must be between 1 - 60 minutes')
 
+    import urllib3
+
+    # Shared across warm invocations so the connection can be reused
+    http = urllib3.PoolManager(maxsize=1, retries=False)
+
+    lambda_ping_function_name = ivr.config.get(
+                                    'aws',
+                                    'lambda_ping_function_name',
+                                    fallback=None
+                                )
+
+    if lambda_ping_function_name:
+        import boto3
+        from botocore.exceptions import ClientError
+
+        lambda_client = boto3.client('lambda')
+
+        # A minimal API gateway style event routed to the /ping endpoint
+        lambda_ping_payload = json.dumps({
+            'requestContext': {'resourcePath': '/ping', 'httpMethod': 'GET'},
+            'headers': {},
+            'queryStringParameters': None,
+            'multiValueQueryStringParameters': None,
+            'pathParameters': None,
+            'stageVariables': None,
+            'body': None,
+        }).encode()
+
+
+# Shared by all TwiML responses (never modified as CORS isn't enabled)
+twiml_headers = {'Content-Type': 'text/xml; charset=utf-8'}
+
 
 def create_response(response_body: str = ''):
     """
@@ -57,7 +97,7 @@ def create_response(response_body: str = ''):
     return Response(
         body=response_body,
         status_code=200,
-        headers={'Content-Type': 'text/xml'}
+        headers=twiml_headers
     )
 
 
@@ -67,15 +107,14 @@ def create_redirect(path: str, say_text: str = None):
     (useful in case of script errors) with an optional spoken message
     """
 
-    resp = VoiceResponse()
-
     # Provide some feedback before the redirect
-    if say_text is not None:
-        resp.say(say_text)
+    say = f'<Say>{xml_escape(say_text)}</Say>' if say_text is not None else ''
 
-    resp.redirect(url_of(app, path))
-
-    return create_response(str(resp))
+    return create_response(
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        f'<Response>{say}<Redirect>{xml_escape(url_of(app, path))}</Redirect>'
+        '</Response>'
+    )
 
 
 def create_hangup(say_text: str = None):
@@ -83,15 +122,17 @@ def create_hangup(say_text: str = None):
     Create a simple hangup (with an optional spoken message)
     """
 
-    resp = VoiceResponse()
+    # Provide some feedback before the hangup
+    say = f'<Say>{xml_escape(say_text)}</Say>' if say_text is not None else ''
 
-    # Provide some feedback before the redirect
-    if say_text is not None:
-        resp.say(say_text)
+    return create_response(
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        f'<Response>{say}<Hangup /></Response>'
+    )
 
-    resp.hangup()
 
-    return create_response(str(resp))
+# Static TwiML, only rendered once
+hangup_twiml = create_hangup().body
 
 
 if lambda_ping_frequency_minutes:
@@ -104,14 +145,32 @@ if lambda_ping_frequency_minutes:
 
         config = ivr.get_config_section('aws')
 
-        ping_endpoint_data = None
-        if 'lambda_ping_endpoint' in config:
-            ping_endpoint_data = urlopen(config['lambda_ping_endpoint']).read()
-            print(f'IVR invoked result: {ping_endpoint_data}')
+        if lambda_ping_function_name:
+            # Asynchronous invocation, no need to wait for the result
+            try:
+                lambda_client.invoke(
+                    FunctionName=lambda_ping_function_name,
+                    InvocationType='Event',
+                    Payload=lambda_ping_payload
+                )
+                print(f'IVR invoked: {lambda_ping_function_name}')
+            except ClientError as e:
+                print(f'Unable to invoke IVR {lambda_ping_function_name}: {e}')
+        elif 'lambda_ping_endpoint' in config:
+            ping_resp = http.request(
+                'GET',
+                config['lambda_ping_endpoint'],
+                preload_content=False
+            )
+            # The body must be consumed before the connection can be reused
+            ping_resp.drain_conn()
+            ping_resp.release_conn()
+            print(f'IVR invoked status: {ping_resp.status}')
         else:
             print(
-                ('No \'lambda_ping_endpoint\' defined, ',
-                    'unable to keep IVR warm')
+                'No \'lambda_ping_function_name\' or '
+                '\'lambda_ping_endpoint\' defined, '
+                'unable to keep IVR warm'
             )
 
         return {
@@ -122,8 +181,8 @@ if lambda_ping_frequency_minutes:
 
 @app.route(
     '/ping',
-    methods=['GET', 'POST'],
-    content_types=['application/json', 'application/x-www-form-urlencoded']
+    methods=route_methods,
+    content_types=route_content_types
 )
 def ping():
     """
@@ -138,8 +197,8 @@ def ping():
 
 @app.route(
     '/ivr',
-    methods=['GET', 'POST'],
-    content_types=['application/json', 'application/x-www-form-urlencoded']
+    methods=route_methods,
+    content_types=route_content_types
 )
 def ivr_welcome():
     """
@@ -153,21 +212,21 @@ def ivr_welcome():
 
 @app.route(
     '/ivr/hangup',
-    methods=['GET', 'POST'],
-    content_types=['application/json', 'application/x-www-form-urlencoded']
+    methods=route_methods,
+    content_types=route_content_types
 )
 def ivr_hangup():
     """
     Hangup the call
     """
 
-    return create_hangup()
+    return create_response(hangup_twiml)
 
 
 @app.route(
     '/ivr/menu',
-    methods=['GET', 'POST'],
-    content_types=['application/json', 'application/x-www-form-urlencoded']
+    methods=route_methods,
+    content_types=route_content_types
 )
 def ivr_menu():
     """
@@ -178,10 +237,10 @@ def ivr_menu():
 
     if app.current_request.method == 'POST':
         # Parse form_data to get selected menu option
-        form_data = parse_qs(app.current_request.raw_body.decode())
+        digits = parsed_form(app.current_request).get('Digits')
 
-        if 'Digits' in form_data and form_data['Digits']:
-            return create_redirect(f"/ivr/menu/{form_data['Digits'][0]}")
+        if digits:
+            return create_redirect(f'/ivr/menu/{digits}')
 
         if app.current_request.query_params \
                 and 'loop_count' in app.current_request.query_params.keys():
@@ -195,33 +254,33 @@ def ivr_menu():
 
 @app.route(
     '/ivr/menu/{option}',
-    methods=['GET', 'POST'],
-    content_types=['application/json', 'application/x-www-form-urlencoded']
+    methods=route_methods,
+    content_types=route_content_types
 )
 def ivr_menu_option(option=None):
     """
     IVR menu option processing
     """
 
-    try:
-        option = int(option)
-    except ValueError:
+    # Single digit menu bounds checking
+    if option is None or len(option) != 1 or option not in '0123456789':
         return create_redirect('/ivr/menu', 'Invalid menu option selected')
 
-    # Main menu + single digit menu bounds checking
-    if option is None or not 0 <= option <= 9:
+    try:
+        menu_option_section = ivr.get_menu_option_section(int(option))
+    except IvrSectionNotFoundError:
         return create_redirect('/ivr/menu', 'Invalid menu option selected')
 
     # Process selected menu option
     return create_response(
-        ivr.get_menu_option_section(option).execute()
+        menu_option_section.execute()
     )
 
 
 @app.route(
     '/ivr/action/{action}',
-    methods=['GET', 'POST'],
-    content_types=['application/json', 'application/x-www-form-urlencoded']
+    methods=route_methods,
+    content_types=route_content_types
 )
 def ivr_action(action=None):
     """
@@ -236,7 +295,7 @@ def ivr_action(action=None):
 @app.route(
     '/ivr/callback/forward/call_status',
     methods=['POST'],
-    content_types=['application/json', 'application/x-www-form-urlencoded']
+    content_types=route_content_types
 )
 def ivr_callback_forward_call_status(action=None):
     """
@@ -254,11 +313,9 @@ def ivr_callback_forward_call_status(action=None):
     }
 
     # Parse form_data
-    form_data = parse_qs(app.current_request.raw_body.decode())
-
-    if 'DialCallStatus' in form_data and form_data['DialCallStatus']:
-        twilio_call_status = form_data['DialCallStatus'][0]
+    twilio_call_status = parsed_form(app.current_request).get('DialCallStatus')
 
+    if twilio_call_status:
         if twilio_call_status in call_status_map:
             # Determine which section initiated this callback
             if 'initiated_by_section' in app.current_request.query_params:
@@ -279,7 +336,7 @@ def ivr_callback_forward_call_status(action=None):
 @app.route(
     '/ivr/callback/voicemail/alert_sms',
     methods=['POST'],
-    content_types=['application/json', 'application/x-www-form-urlencoded']
+    content_types=route_content_types
 )
 def ivr_callback_voicemail_alert_sms():
     """
@@ -287,11 +344,10 @@ def ivr_callback_voicemail_alert_sms():
     """
 
     # Parse form_data
-    form_data = parse_qs(app.current_request.raw_body.decode())
+    form_data = parsed_form(app.current_request)
 
     if 'RecordingUrl' in form_data \
-            and 'RecordingStatus' in form_data \
-            and form_data['RecordingStatus'][0] == 'completed':
+            and form_data.get('RecordingStatus') == 'completed':
 
         if 'initiated_by_section' in app.current_request.query_params:
             initiated_by_section = \
@@ -300,7 +356,7 @@ def ivr_callback_voicemail_alert_sms():
             section_data = ivr.config[f'action_{initiated_by_section}']
 
             ivr.twilio_client.messages.create(
-                body='New voicemail: '+str(form_data['RecordingUrl'][0]),
+                body='New voicemail: '+form_data['RecordingUrl'],
                 from_=section_data['voicemail_alert_sms_from'],
                 to=section_data['voicemail_alert_sms_to']
             )
@@ -310,8 +366,8 @@ def ivr_callback_voicemail_alert_sms():
 
 @app.route(
     '/ivr/callback/voicemail/hangup',
-    methods=['GET', 'POST'],
-    content_types=['application/json', 'application/x-www-form-urlencoded']
+    methods=route_methods,
+    content_types=route_content_types
 )
 def ivr_callback_voicemail_hangup():
     """
@@ -54,3 +54,6 @@ def cli_main(
     else:
         ivr = Ivr(args.config, app)
         ivr.test()
+
+    # Allows the lambda to skip validating the config
+    ivr.mark_config_validated()
@@ -1,4 +1,33 @@
+from urllib.parse import parse_qsl
+
 from chalice import Chalice
+from chalice.app import Request
+
+
+# Base URLs by host (constant for the lifetime of a warm lambda)
+_BASE_URLS = {}
+
+
+def _base_url_of(request: Request):
+    """
+    Returns the base URL (including any stage) of a request
+    """
+
+    headers = request.headers
+
+    scheme = headers.get('x-forwarded-proto', 'http')
+
+    try:
+        host = headers['host']
+    except KeyError:
+        raise Exception('Unable to determine host')
+
+    stage = request.context.get('stage', '').strip('/')
+
+    if stage:
+        return f'{scheme}://{host}/{stage}/'
+
+    return f'{scheme}://{host}/'
 
 
 def url_of(app: Chalice, path: str = None):
@@ -6,34 +35,36 @@ def url_of(app: Chalice, path: str = None):
     Returns a usable URL based on an API endpoint path
     """
 
-    if not app.current_request:
-        return path
+    request = app.current_request
 
-    request = app.current_request.to_dict()
+    if not request:
+        return path
 
-    if not path.startswith('/') and path is not None:
+    if path is not None and not path.startswith('/'):
         raise Exception(f'path must start with a leading slash: {path}')
 
-    try:
-        scheme = request['headers']['x-forwarded-proto']
-    except KeyError:
-        scheme = 'http'
+    host = request.headers.get('host')
 
     try:
-        host = request['headers']['host']
+        base_url = _BASE_URLS[host]
     except KeyError:
-        raise Exception('Unable to determine host')
+        base_url = _BASE_URLS[host] = _base_url_of(request)
 
-    path = '' if path is None else str(path)
+    if path is None:
+        return base_url
 
-    try:
-        stage = request['context']['stage']
-    except KeyError:
-        stage = ''
+    return base_url + path[1:]
+
+
+def parsed_form(request: Request):
+    """
+    Returns the (single valued) form data of a request, parsed once per request
+    """
+
+    form = getattr(request, '_form_cache', None)
 
-    # Normalise the path of this URL
-    stage = stage.strip('/')
-    path = path.lstrip('/')
-    pathinfo = f'{stage}/{path}'.lstrip('/')
+    if form is None:
+        form = dict(parse_qsl((request.raw_body or b'').decode('utf-8')))
+        request._form_cache = form
 
-    return f'{scheme}://{host}/{pathinfo}'
+    return form
@@ -1,17 +1,23 @@
 import os
 import re
+import copy
+import time
+import hashlib
 import datetime
 import configparser
 from abc import ABC, abstractmethod
+from zoneinfo import ZoneInfo
 
-import pytz
 from chalice import Chalice
-from twilio.rest import Client
 from twilio.twiml.voice_response import VoiceResponse, Gather
 
 from chalicelib.ext import url_of
 
 
+# Parsed configs, keyed by path & modification time (reused by warm lambdas)
+_CONFIG_CACHE = {}
+
+
 class IvrError(Exception):
     pass
 
@@ -41,13 +47,17 @@ class Ivr:
     The main controlling class for the IVR script
     """
 
-    def __init__(self, config_path: str, app: Chalice):
+    def __init__(self, config_path: str, app: Chalice, validate: bool = True):
         """
         Object initialisation
+        (section field validation can be skipped for an already validated
+        config, see is_config_validated)
         """
 
+        self.config_path = config_path
         self.config = self._parse_config(config_path)
         self.app = app
+        self.validate = validate
 
         # Turn on chalice debugging if it's enable in config
         self.app.debug = self.config.getboolean(
@@ -60,7 +70,7 @@ class Ivr:
         if not self.config.get('ivr', 'timezone'):
             raise IvrError('IVR timezone not set in config')
 
-        self.timezone = pytz.timezone(self.config.get('ivr', 'timezone'))
+        self.timezone = ZoneInfo(self.config.get('ivr', 'timezone'))
 
         twilio_account_sid = self.config.get('twilio', 'account_sid')
         twilio_auth_token = self.config.get('twilio', 'auth_token')
@@ -75,45 +85,136 @@ class Ivr:
                 'No twilio auth_token defined in config file'
             )
 
-        self.twilio_client = Client(twilio_account_sid, twilio_auth_token)
+        self._twilio_credentials = (twilio_account_sid, twilio_auth_token)
+        self._twilio_client = None
+
+        # Open/closed verdicts by hours name: (valid until timestamp, is open)
+        self._hours_verdicts = {}
+
+        self._build_sections()
+
+    @property
+    def twilio_client(self):
+        """
+        Twilio REST client, created when first used
+        (keeps the twilio.rest import out of lambda cold starts)
+        """
+
+        if self._twilio_client is None:
+            from twilio.rest import Client
+
+            self._twilio_client = Client(*self._twilio_credentials)
+
+        return self._twilio_client
 
     def _parse_config(self, config_path: str):
         """
         Parse provided config
         """
 
-        if not os.path.exists(config_path):
+        try:
+            cache_key = (config_path, os.stat(config_path).st_mtime_ns)
+        except FileNotFoundError:
             raise IvrError(f'Invalid configuration path: {config_path}')
 
+        config = _CONFIG_CACHE.get(cache_key)
+        if config is not None:
+            return config
+
         config = configparser.ConfigParser()
 
-        if not len(config.read(config_path)):
+        try:
+            with open(config_path, encoding='utf-8') as config_file:
+                config.read_file(config_file)
+        except OSError:
             raise IvrError('Failed parsing config')
 
+        _CONFIG_CACHE[cache_key] = config
+
         return config
 
+    @staticmethod
+    def _config_digest(config_path: str):
+        """
+        Returns a hash of the config file's contents
+        """
+
+        with open(config_path, 'rb') as config_file:
+            return hashlib.sha256(config_file.read()).hexdigest()
+
+    @staticmethod
+    def is_config_validated(config_path: str):
+        """
+        Check whether a config has been validated (see mark_config_validated)
+        and not modified since
+        """
+
+        try:
+            with open(f'{config_path}.validated') as marker_file:
+                validated_digest = marker_file.read().strip()
+
+            return validated_digest == Ivr._config_digest(config_path)
+        except FileNotFoundError:
+            return False
+
+    def mark_config_validated(self):
+        """
+        Record that the config has passed validation
+        (via a marker file alongside the config holding a hash of its contents)
+        """
+
+        with open(f'{self.config_path}.validated', 'w') as marker_file:
+            marker_file.write(Ivr._config_digest(self.config_path))
+
     def get_config_section(self, section_name: str):
         try:
-            return dict(self.config[section_name])
+            return self.config[section_name]
         except KeyError:
             raise IvrSectionNotFoundError(section_name)
 
-    def get_welcome_section(self):
-        return IvrWelcomeSection(self, self.get_config_section('ivr_welcome'))
+    def _build_sections(self):
+        """
+        Build & validate each config section once
+        (reused by warm lambda invocations)
+        """
 
-    def get_menu_section(self):
-        return IvrMenuSection(self, self.get_config_section('ivr_menu'))
+        self._hours_sections = {
+            section_name[6:]: IvrHoursSection(
+                self,
+                section_name[6:],
+                self.get_config_section(section_name)
+            )
+            for section_name in self.config.keys()
+            if section_name.startswith('hours_')
+        }
 
-    def get_menu_option_section(self, option: int):
-        assert 0 <= option <= 9, f'Invalid menu option value: {option}'
+        self._action_sections = {
+            section_name[7:]: self._build_action_section(section_name[7:])
+            for section_name in self.config.keys()
+            if section_name.startswith('action_')
+        }
 
-        return IvrMenuOptionSection(
+        self._welcome_section = IvrWelcomeSection(
             self,
-            option,
-            self.get_config_section(f'ivr_menu_option_{option}')
+            self.get_config_section('ivr_welcome')
         )
 
-    def get_action_section(self, name: str):
+        self._menu_section = IvrMenuSection(
+            self,
+            self.get_config_section('ivr_menu')
+        )
+
+        self._menu_option_sections = {
+            option: IvrMenuOptionSection(
+                self,
+                option,
+                self.get_config_section(f'ivr_menu_option_{option}')
+            )
+            for option in range(10)
+            if f'ivr_menu_option_{option}' in self.config
+        }
+
+    def _build_action_section(self, name: str):
         try:
             config_section = self.get_config_section(f'action_{name}')
         except IvrSectionNotFoundError:
@@ -135,12 +236,50 @@ class Ivr:
 
         return action_types[config_section['type']](self, name, config_section)
 
+    def get_welcome_section(self):
+        return self._welcome_section
+
+    def get_menu_section(self):
+        # Copied as the menu loop count is set per request
+        return copy.copy(self._menu_section)
+
+    def get_menu_option_section(self, option: int):
+        assert 0 <= option <= 9, f'Invalid menu option value: {option}'
+
+        try:
+            return self._menu_option_sections[option]
+        except KeyError:
+            raise IvrSectionNotFoundError(f'ivr_menu_option_{option}')
+
+    def get_action_section(self, name: str):
+        try:
+            return self._action_sections[name]
+        except KeyError:
+            raise IvrError(f'Invalid action: {name}')
+
     def get_hours_section(self, name: str):
-        return IvrHoursSection(
-            self,
-            name,
-            self.get_config_section(f'hours_{name}')
-        )
+        try:
+            return self._hours_sections[name]
+        except KeyError:
+            raise IvrSectionNotFoundError(f'hours_{name}')
+
+    def is_hours_open(self, name: str):
+        """
+        Check whether the named hours are currently open
+        (cached until the next minute, as hours are defined to the minute)
+        """
+
+        timestamp = time.time()
+
+        verdict = self._hours_verdicts.get(name)
+        if verdict is not None and timestamp < verdict[0]:
+            return verdict[1]
+
+        is_open = self.get_hours_section(name).is_within_hours()
+
+        self._hours_verdicts[name] = (timestamp - timestamp % 60 + 60, is_open)
+
+        return is_open
 
     def get_now(self):
         """
@@ -155,33 +294,27 @@ class Ivr:
         (and in doing so perform a basic mandatory field test on it)
         """
 
-        if verbose:
-            print('Testing [ivr_welcome] section')
+        printf = print if verbose else (lambda *args, **kwargs: None)
+
+        printf('Testing [ivr_welcome] section')
         self.get_welcome_section()
 
-        if verbose:
-            print('Testing [ivr_menu] section')
+        printf('Testing [ivr_menu] section')
         self.get_menu_section()
 
         for section_name in range(9):
-            if verbose:
-                print(f'Testing [ivr_menu_option_{section_name}] section')
+            printf(f'Testing [ivr_menu_option_{section_name}] section')
             self.get_menu_option_section(section_name)
 
         for section_name in self.config.keys():
             if section_name.startswith('action_'):
-                if verbose:
-                    print(f'Testing [{section_name}] section')
+                printf(f'Testing [{section_name}] section')
                 self.get_action_section(section_name[7:])
-
-        for section_name in self.config.keys():
-            if section_name.startswith('hours_'):
-                if verbose:
-                    print(f'Testing [{section_name}] section')
+            elif section_name.startswith('hours_'):
+                printf(f'Testing [{section_name}] section')
                 self.get_hours_section(section_name[6:])
 
-        if verbose:
-            print('Configuration looks correct.')
+        printf('Configuration looks correct.')
 
 
 class IvrSection(ABC):
@@ -190,20 +323,21 @@ class IvrSection(ABC):
     """
 
     def __init__(self, ivr: Ivr, name: str, section_data: dict,
-                 valid_fields: set = set(), mandatory_fields: set = set()):
+                 valid_fields: frozenset = frozenset(),
+                 mandatory_fields: frozenset = frozenset()):
         self.ivr = ivr
         self.name = name
         self.section_data = section_data
 
-        if valid_fields:
+        if valid_fields and ivr.validate:
             self._check_valid_fields(valid_fields)
 
-        if mandatory_fields:
+        if mandatory_fields and ivr.validate:
             self._check_mandatory_fields(mandatory_fields)
 
-        self.has_hours = 'hours' in self.section_data.keys()
+        self.has_hours = 'hours' in self.section_data
 
-    def _check_mandatory_fields(self, mandatory_fields: set):
+    def _check_mandatory_fields(self, mandatory_fields: frozenset):
         """
         Confirms mandatory fields are defined in a config section
         """
@@ -214,7 +348,7 @@ class IvrSection(ABC):
             if field not in section_data_keys:
                 raise IvrSectionMissingMandatoryFieldError(field)
 
-    def _check_valid_fields(self, valid_fields: set):
+    def _check_valid_fields(self, valid_fields: frozenset):
         """
         Defines all mandatory & optional sections fields
         """
@@ -233,9 +367,7 @@ class IvrSection(ABC):
         if not self.has_hours:
             return resp
 
-        hours_section = self.ivr.get_hours_section(self.section_data['hours'])
-
-        if not hours_section.is_within_hours():
+        if not self.ivr.is_hours_open(self.section_data['hours']):
             if 'hours_action_on_closed' not in self.section_data:
                 raise IvrSectionFieldError(
                     (f'Required field \'hours_action_on_closed\' ',
@@ -259,21 +391,57 @@ class IvrSection(ABC):
         pass
 
 
-class IvrWelcomeSection(IvrSection):
+class IvrStaticSection(IvrSection):
+    """
+    Abstract base for sections whose TwiML doesn't change while they're open
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        # Rendered open TwiML by base URL (reused by warm lambdas)
+        self._rendered_open = {}
+
+    def render_open(self):
+        """
+        Returns the TwiML for when the section is open
+        (only rendered once for each base URL)
+        """
+
+        base_url = self.url_of('/')
+
+        twiml = self._rendered_open.get(base_url)
+        if twiml is None:
+            twiml = self._rendered_open[base_url] = self._render_open()
+
+        return twiml
+
+    @abstractmethod
+    def _render_open(self):
+        """
+        Renders the TwiML for when the section is open
+        """
+
+        pass
+
+
+class IvrWelcomeSection(IvrStaticSection):
     """
     The root welcome section of the IVR script
     """
 
+    _VALID_FIELDS = frozenset({
+        'hours',
+        'hours_action_on_closed',
+        'play_sample',
+    })
+
     def __init__(self, ivr: Ivr, section_data: dict):
         super().__init__(
             ivr,
             'welcome',
             section_data,
-            {
-                'hours',
-                'hours_action_on_closed',
-                'play_sample',
-            }
+            IvrWelcomeSection._VALID_FIELDS
         )
 
     def execute(self):
@@ -281,6 +449,9 @@ class IvrWelcomeSection(IvrSection):
         if resp is not None:
             return str(resp)
 
+        return self.render_open()
+
+    def _render_open(self):
         resp = VoiceResponse()
 
         if 'play_sample' in self.section_data.keys():
@@ -296,23 +467,27 @@ class IvrMenuSection(IvrSection):
     The main menu section of the IVR script
     """
 
+    _VALID_FIELDS = frozenset({
+        'hours',
+        'hours_action_on_closed',
+        'play_sample',
+        'no_input_sample',
+        'no_input_max_loops',
+        'no_input_action_on_max_loops',
+        'pause',
+    })
+
+    _MANDATORY_FIELDS = frozenset({
+        'play_sample',
+    })
+
     def __init__(self, ivr: Ivr, section_data: dict):
         super().__init__(
             ivr,
             'menu',
             section_data,
-            {
-                'hours',
-                'hours_action_on_closed',
-                'play_sample',
-                'no_input_sample',
-                'no_input_max_loops',
-                'no_input_action_on_max_loops',
-                'pause'
-            },
-            {
-                'play_sample',
-            }
+            IvrMenuSection._VALID_FIELDS,
+            IvrMenuSection._MANDATORY_FIELDS
         )
 
         self.loop_count = 1
@@ -355,25 +530,29 @@ class IvrMenuSection(IvrSection):
         return str(resp)
 
 
-class IvrMenuOptionSection(IvrSection):
+class IvrMenuOptionSection(IvrStaticSection):
     """
     A menu option of the IVR script
     """
 
+    _VALID_FIELDS = frozenset({
+        'hours',
+        'hours_action_on_closed',
+        'play_sample',
+        'action',
+    })
+
+    _MANDATORY_FIELDS = frozenset({
+        'action',
+    })
+
     def __init__(self, ivr: Ivr, option: int, section_data: dict):
         super().__init__(
             ivr,
             str(option),
             section_data,
-            {
-                'hours',
-                'hours_action_on_closed',
-                'play_sample',
-                'action',
-            },
-            {
-                'action',
-            }
+            IvrMenuOptionSection._VALID_FIELDS,
+            IvrMenuOptionSection._MANDATORY_FIELDS
         )
 
     def execute(self):
@@ -381,6 +560,9 @@ class IvrMenuOptionSection(IvrSection):
         if resp is not None:
             return str(resp)
 
+        return self.render_open()
+
+    def _render_open(self):
         resp = VoiceResponse()
 
         if 'play_sample' in self.section_data.keys():
@@ -401,26 +583,30 @@ class IvrActionSection(IvrSection):
     pass
 
 
-class IvrActionRedirect(IvrActionSection):
+class IvrActionRedirect(IvrActionSection, IvrStaticSection):
     """
     Redirect to another endpoint
     """
 
+    _VALID_FIELDS = frozenset({
+        'type',
+        'hours',
+        'hours_action_on_closed',
+        'play_sample',
+        'path',
+    })
+
+    _MANDATORY_FIELDS = frozenset({
+        'path',
+    })
+
     def __init__(self, ivr: Ivr, name: str, section_data: dict):
         super().__init__(
             ivr,
             name,
             section_data,
-            {
-                'type',
-                'hours',
-                'hours_action_on_closed',
-                'play_sample',
-                'path',
-            },
-            {
-                'path',
-            }
+            IvrActionRedirect._VALID_FIELDS,
+            IvrActionRedirect._MANDATORY_FIELDS
         )
 
         if not self.section_data['path']:
@@ -431,6 +617,9 @@ class IvrActionRedirect(IvrActionSection):
         if resp is not None:
             return str(resp)
 
+        return self.render_open()
+
+    def _render_open(self):
         resp = VoiceResponse()
 
         try:
@@ -444,22 +633,24 @@ class IvrActionRedirect(IvrActionSection):
         return str(resp)
 
 
-class IvrActionHangup(IvrActionSection):
+class IvrActionHangup(IvrActionSection, IvrStaticSection):
     """
     Hangup after it has been played
     """
 
+    _VALID_FIELDS = frozenset({
+        'type',
+        'hours',
+        'hours_action_on_closed',
+        'play_sample',
+    })
+
     def __init__(self, ivr: Ivr, name: str, section_data: dict):
         super().__init__(
             ivr,
             name,
             section_data,
-            {
-                'type',
-                'hours',
-                'hours_action_on_closed',
-                'play_sample',
-            }
+            IvrActionHangup._VALID_FIELDS
         )
 
     def execute(self):
@@ -467,6 +658,9 @@ class IvrActionHangup(IvrActionSection):
         if resp is not None:
             return str(resp)
 
+        return self.render_open()
+
+    def _render_open(self):
         resp = VoiceResponse()
 
         if 'play_sample' in self.section_data.keys():
@@ -477,34 +671,38 @@ class IvrActionHangup(IvrActionSection):
         return str(resp)
 
 
-class IvrActionForward(IvrActionSection):
+class IvrActionForward(IvrActionSection, IvrStaticSection):
     """
     Forward the call to a number
     """
 
+    _VALID_FIELDS = frozenset({
+        'type',
+        'hours',
+        'hours_action_on_closed',
+        'play_sample',
+        'phone_number',
+        'action_on_busy',
+        'action_on_no_answer',
+        'action_on_failed',
+        'action_on_canceled',
+    })
+
+    _MANDATORY_FIELDS = frozenset({
+        'phone_number',
+        'action_on_busy',
+        'action_on_no_answer',
+        'action_on_failed',
+        'action_on_canceled',
+    })
+
     def __init__(self, ivr: Ivr, name: str, section_data: dict):
         super().__init__(
             ivr,
             name,
             section_data,
-            {
-                'type',
-                'hours',
-                'hours_action_on_closed',
-                'play_sample',
-                'phone_number',
-                'action_on_busy',
-                'action_on_no_answer',
-                'action_on_failed',
-                'action_on_canceled',
-            },
-            {
-                'phone_number',
-                'action_on_busy',
-                'action_on_no_answer',
-                'action_on_failed',
-                'action_on_canceled',
-            }
+            IvrActionForward._VALID_FIELDS,
+            IvrActionForward._MANDATORY_FIELDS
         )
 
     def execute(self):
@@ -512,6 +710,9 @@ class IvrActionForward(IvrActionSection):
         if resp is not None:
             return str(resp)
 
+        return self.render_open()
+
+    def _render_open(self):
         resp = VoiceResponse()
 
         if self.section_data['play_sample']:
@@ -526,35 +727,39 @@ class IvrActionForward(IvrActionSection):
         return str(resp)
 
 
-class IvrActionVoicemail(IvrActionSection):
+class IvrActionVoicemail(IvrActionSection, IvrStaticSection):
     """
     Play a message and then allow callers to leave a voicemail
     """
 
+    _VALID_FIELDS = frozenset({
+        'type',
+        'hours',
+        'hours_action_on_closed',
+        'play_sample',
+        'hangup_sample',
+        'voicemail_alert_sms_from',
+        'voicemail_alert_sms_to',
+        'voicemail_timeout',
+        'voicemail_max_length',
+    })
+
+    _MANDATORY_FIELDS = frozenset({
+        'play_sample',
+        'hangup_sample',
+        'voicemail_alert_sms_from',
+        'voicemail_alert_sms_to',
+        'voicemail_timeout',
+        'voicemail_max_length',
+    })
+
     def __init__(self, ivr: Ivr, name: str, section_data: dict):
         super().__init__(
             ivr,
             name,
             section_data,
-            {
-                'type',
-                'hours',
-                'hours_action_on_closed',
-                'play_sample',
-                'hangup_sample',
-                'voicemail_alert_sms_from',
-                'voicemail_alert_sms_to',
-                'voicemail_timeout',
-                'voicemail_max_length',
-            },
-            {
-                'play_sample',
-                'hangup_sample',
-                'voicemail_alert_sms_from',
-                'voicemail_alert_sms_to',
-                'voicemail_timeout',
-                'voicemail_max_length',
-            }
+            IvrActionVoicemail._VALID_FIELDS,
+            IvrActionVoicemail._MANDATORY_FIELDS
         )
 
     def execute(self):
@@ -562,6 +767,9 @@ class IvrActionVoicemail(IvrActionSection):
         if resp is not None:
             return str(resp)
 
+        return self.render_open()
+
+    def _render_open(self):
         resp = VoiceResponse()
 
         if self.section_data['play_sample']:
@@ -587,7 +795,8 @@ class IvrHoursSection(IvrSection):
     An hours section from the IVR config
     """
 
-    weekdays = [
+    # Ordered to match datetime.weekday()
+    weekdays = (
         'mon',
         'tue',
         'wed',
@@ -595,45 +804,59 @@ class IvrHoursSection(IvrSection):
         'fri',
         'sat',
         'sun',
-    ]
+    )
+
+    _VALID_FIELDS = frozenset(weekdays)
+
+    _MANDATORY_FIELDS = _VALID_FIELDS
+
+    # HHMM-HHMM
+    _TIMEFRAME_RE = re.compile(
+        r'^([01]\d|2[0-3])([0-5]\d)-([01]\d|2[0-3])([0-5]\d)$'
+    )
+
+    _STRIP_SPACES = {ord(' '): None}
 
     def __init__(self, ivr: Ivr, name: str, section_data: dict):
         super().__init__(
             ivr,
             name,
             section_data,
-            IvrHoursSection.weekdays,
-            IvrHoursSection.weekdays,
+            IvrHoursSection._VALID_FIELDS,
+            IvrHoursSection._MANDATORY_FIELDS
         )
 
-        self.data = self._parse_section_data(section_data)
+        self.from_minutes, self.to_minutes = \
+            self._parse_section_data(section_data)
 
     def _parse_section_data(self, section_data: dict):
         """
-        Returns a useful data structure from the config dict
+        Returns the from/to minute of the day for each weekday (by index)
+        from the config dict
         """
 
         # Parse the config data into something we can use
 
         # Initialise data structure to default to closed all day
-        data = {
-            day: {'from': None, 'to': None} for day in IvrHoursSection.weekdays
-        }
+        from_minutes = [None] * len(IvrHoursSection.weekdays)
+        to_minutes = [None] * len(IvrHoursSection.weekdays)
+
+        for weekday, day in enumerate(IvrHoursSection.weekdays):
+            hours_str = None
 
-        for day in IvrHoursSection.weekdays:
             # Clean up value
             try:
-                hours_str = section_data[day].replace(' ', '')
+                hours_str = section_data[day].translate(
+                    IvrHoursSection._STRIP_SPACES
+                )
             except KeyError:
                 # Doesn't matter if it's not defined when we're iterating
                 pass
 
             # Parse the from/to times
             if hours_str:
-                time_regex = r'([01]\d|2[0-3])([0-5]\d)'
-                timeframe_regex = f'^{time_regex}-{time_regex}$'
-
-                timeframe_matches = re.match(timeframe_regex, hours_str)
+                timeframe_matches = \
+                    IvrHoursSection._TIMEFRAME_RE.match(hours_str)
 
                 if timeframe_matches is None:
                     raise IvrError(
@@ -641,17 +864,13 @@ class IvrHoursSection(IvrSection):
                             'it must be in the format HHMM-HHMM')
                     )
 
-                data[day]['from'] = datetime.time(
-                    hour=int(timeframe_matches[1]),
-                    minute=int(timeframe_matches[2])
-                )
+                from_minutes[weekday] = \
+                    int(timeframe_matches[1])*60 + int(timeframe_matches[2])
 
-                data[day]['to'] = datetime.time(
-                    hour=int(timeframe_matches[3]),
-                    minute=int(timeframe_matches[4])
-                )
+                to_minutes[weekday] = \
+                    int(timeframe_matches[3])*60 + int(timeframe_matches[4])
 
-        return data
+        return tuple(from_minutes), tuple(to_minutes)
 
     def is_within_hours(self):
         """
@@ -659,14 +878,15 @@ class IvrHoursSection(IvrSection):
         """
 
         now = self.ivr.get_now()
-        time_now = now.time()
-        day_hours = self.data[IvrHoursSection.weekdays[now.weekday()]]
+        weekday = now.weekday()
+        from_minute = self.from_minutes[weekday]
+        to_minute = self.to_minutes[weekday]
 
         # Closed all day
-        if not day_hours['from'] or not day_hours['to']:
+        if from_minute is None or to_minute is None:
             return False
 
-        return (time_now >= day_hours['from'] and time_now <= day_hours['to'])
+        return from_minute <= now.hour*60 + now.minute <= to_minute
 
     def execute(self):
         return self.is_within_hours()